@@ -1,15 +1,31 @@
 import yfinance as yf
 import pandas as pd
 import os
-import requests
-from bs4 import BeautifulSoup
-import time
+import re
+try:
+    from src.data.http_session import make_session
+except ModuleNotFoundError:  # run directly as a script from src/data
+    from http_session import make_session
+from selectolax.parser import HTMLParser
+from concurrent.futures import ThreadPoolExecutor
+
+# Shared pool for network-bound page probes
+executor = ThreadPoolExecutor(max_workers=16)
+
+# Link text that suggests an annual or sustainability report
+REPORT_KEYWORDS_RE = re.compile(r'annual|report|sustainability|esg|10-k', re.IGNORECASE)
 
 class CompanyDataCollector:
     def __init__(self, output_dir='data/raw'):
         self.output_dir = output_dir
         os.makedirs(output_dir, exist_ok=True)
         
+        # Shared, disk-cached HTTP session
+        self.session = make_session(os.path.join(output_dir, 'http_cache'))
+        
+        # Yahoo Finance profile info, fetched at most once per ticker
+        self._info_cache = {}
+        
     def get_stock_data(self, ticker_symbol, period="1y"):
         """Fetch stock data for a given ticker"""
         try:
@@ -20,24 +36,65 @@ class CompanyDataCollector:
             print(f"Error fetching stock data for {ticker_symbol}: {e}")
             return pd.DataFrame()
             
+    def get_stock_data_batch(self, ticker_symbols, period="1y"):
+        """Fetch stock data for several tickers in one batched download, keyed by ticker"""
+        try:
+            # Match Ticker.history(): adjusted prices, the Dividends and Stock Splits columns
+            # and a timezone-aware index, so batch and per-ticker rows store the same Date format
+            data = yf.download(" ".join(ticker_symbols), period=period, group_by='ticker', threads=True,
+                               auto_adjust=True, actions=True, ignore_tz=False)
+            if data.empty:
+                # Nothing downloaded: leave every ticker to the per-ticker fallback
+                return {}
+            if not isinstance(data.columns, pd.MultiIndex):
+                return {ticker_symbols[0]: data}
+            available = set(data.columns.get_level_values(0))
+            return {ticker: data[ticker].dropna(how='all') for ticker in ticker_symbols if ticker in available}
+        except Exception as e:
+            print(f"Error fetching stock data for {', '.join(ticker_symbols)}: {e}")
+            return {}
+            
     def get_company_profile(self, ticker_symbol):
         """Fetch company profile information"""
+        if ticker_symbol in self._info_cache:
+            return self._info_cache[ticker_symbol]
         try:
             stock = yf.Ticker(ticker_symbol)
             info = stock.info
+            self._info_cache[ticker_symbol] = info
             return info
         except Exception as e:
             print(f"Error fetching company info for {ticker_symbol}: {e}")
             return {}
             
-    def fetch_annual_report_urls(self, ticker_symbol):
+    def fetch_page(self, url):
+        """Fetch a web page, returning None on failure"""
+        try:
+            return self.session.get(url, timeout=10)
+        except Exception as e:
+            print(f"Error accessing {url}: {e}")
+            return None
+            
+    def extract_report_links(self, html, website):
+        """Extract absolute links to PDF reports from a page"""
+        links = []
+        tree = HTMLParser(html)
+        # Look for PDF links that might be reports
+        for link in tree.css('a[href]'):
+            href = link.attributes.get('href') or ''
+            if href.endswith('.pdf') and REPORT_KEYWORDS_RE.search(link.text()):
+                if not href.startswith('http'):
+                    href = website + href if href.startswith('/') else website + '/' + href
+                links.append(href)
+        return links
+        
+    def fetch_annual_report_urls(self, ticker_symbol, max_reports=10):
         """Find links to annual reports (10-K) and sustainability reports"""
         try:
             # This is a simplified approach - in a real implementation, you might use
             # SEC EDGAR API or more sophisticated web scraping
-            stock = yf.Ticker(ticker_symbol)
-            # Get company website from Yahoo Finance
-            website = stock.info.get('website', '')
+            # Get company website from the (cached) Yahoo Finance profile
+            website = self.get_company_profile(ticker_symbol).get('website', '')
             if not website:
                 return []
                 
@@ -49,36 +106,34 @@ class CompanyDataCollector:
                 f"{website}/corporate-responsibility"
             ]
             
-            report_urls = []
-            for url in potential_urls:
-                try:
-                    response = requests.get(url, timeout=10)
-                    if response.status_code == 200:
-                        soup = BeautifulSoup(response.text, 'html.parser')
-                        # Look for PDF links that might be reports
-                        for link in soup.find_all('a', href=True):
-                            href = link['href']
-                            text = link.text.lower()
-                            if href.endswith('.pdf') and any(keyword in text for keyword in 
-                                                           ['annual', 'report', 'sustainability', 'esg', '10-k']):
-                                if not href.startswith('http'):
-                                    href = website + href if href.startswith('/') else website + '/' + href
-                                report_urls.append(href)
-                    time.sleep(1)  # Be respectful with scraping
-                except Exception as e:
-                    print(f"Error accessing {url}: {e}")
+            # Ordered de-duplication: the same PDF is often linked from several pages
+            report_urls = {}
+            # Probe all candidate pages concurrently, but collect results in submission
+            # order so the chosen URLs and their report numbering are stable across runs
+            futures = [executor.submit(self.fetch_page, url) for url in potential_urls]
+            for future in futures:
+                response = future.result()
+                if response is not None and response.status_code == 200:
+                    report_urls.update(dict.fromkeys(self.extract_report_links(response.content, website)))
+                if len(report_urls) >= max_reports:
+                    # Enough reports found - skip probes that haven't started yet
+                    for pending in futures:
+                        pending.cancel()
+                    break
             
+            report_urls = list(report_urls)[:max_reports]
             return report_urls
         except Exception as e:
             print(f"Error finding reports for {ticker_symbol}: {e}")
             return []
         
-    def save_company_data(self, ticker_symbol):
-        """Save all company data to files"""
-        # Stock price history
-        stock_data = self.get_stock_data(ticker_symbol)
+    def save_company_data(self, ticker_symbol, stock_data=None):
+        """Save all company data to files, returning the company profile or None if nothing was collected"""
+        # Stock price history (unless already fetched in a batch)
+        if stock_data is None:
+            stock_data = self.get_stock_data(ticker_symbol)
         if not stock_data.empty:
-            stock_data.to_csv(f"{self.output_dir}/{ticker_symbol}_stock_data.csv")
+            stock_data.to_parquet(f"{self.output_dir}/{ticker_symbol}_stock_data.parquet", compression='zstd')
         
         # Company profile
         company_info = self.get_company_profile(ticker_symbol)
@@ -92,13 +147,18 @@ class CompanyDataCollector:
                 for url in report_urls:
                     f.write(f"{url}\n")
         
-        return bool(not stock_data.empty or company_info or report_urls)
+        if stock_data.empty and not company_info and not report_urls:
+            return None
+        return company_info
 
 # Example usage
 if __name__ == "__main__":
     collector = CompanyDataCollector()
     # Test with a few tickers
-    for ticker in ["MSFT", "AAPL", "GOOG", "TSLA"]:
-        print(f"Collecting data for {ticker}...")
-        result = collector.save_company_data(ticker)
-        print(f"Data collection for {ticker} {'successful' if result else 'failed'}")
\ No newline at end of file
+    tickers = ["MSFT", "AAPL", "GOOG", "TSLA"]
+    # Fetch all price histories in a single batched request
+    stock_data = collector.get_stock_data_batch(tickers)
+    # Use a separate pool so per-ticker jobs never wait on their own page probes
+    with ThreadPoolExecutor(max_workers=len(tickers)) as ticker_executor:
+        for ticker, result in zip(tickers, ticker_executor.map(collector.save_company_data, tickers, [stock_data.get(t) for t in tickers])):
+            print(f"Data collection for {ticker} {'successful' if result is not None else 'failed'}")
\ No newline at end of file
@@ -1,90 +1,201 @@
 import os
 import pandas as pd
 import json
-from sqlalchemy import create_engine
 import sqlite3
 
+# Column definitions for the tables written by the integrator
+NEWS_COLUMNS = [
+    ('url', 'TEXT'), ('url_mobile', 'TEXT'), ('title', 'TEXT'), ('seendate', 'TEXT'),
+    ('socialimage', 'TEXT'), ('domain', 'TEXT'), ('language', 'TEXT'), ('sourcecountry', 'TEXT')
+]
+TABLE_SCHEMAS = {
+    'companies': [
+        ('ticker', 'TEXT'), ('name', 'TEXT'), ('sector', 'TEXT'), ('industry', 'TEXT'),
+        ('country', 'TEXT'), ('website', 'TEXT'), ('employees', 'INTEGER'), ('market_cap', 'INTEGER')
+    ],
+    'stock_prices': [
+        ('Date', 'TEXT'), ('Open', 'REAL'), ('High', 'REAL'), ('Low', 'REAL'), ('Close', 'REAL'),
+        ('Volume', 'INTEGER'), ('Dividends', 'REAL'), ('Stock Splits', 'REAL'), ('ticker', 'TEXT')
+    ],
+    'news': NEWS_COLUMNS + [('ticker', 'TEXT')],
+    'news_content': NEWS_COLUMNS + [('content', 'TEXT'), ('ticker', 'TEXT')],
+    'reports': [('ticker', 'TEXT'), ('report_text', 'TEXT')]
+}
+
+# Raw file sources streamed into each table, keyed by file name suffix
+# (a Parquet file is preferred over a CSV with the same name when both exist)
+FILE_SOURCES = {
+    'stock_prices': 'stock_data',
+    'news': 'news_data',
+    'news_content': 'news_content_sample'
+}
+CSV_CHUNKSIZE = 50_000
+
+def ensure_unique_ticker(conn, table_name):
+    """Give a ticker-keyed table a unique ticker index if it was written without one"""
+    # One-time migration for tables written by older versions or to_sql: keep the latest
+    # row per ticker, then add the key; tables that already have one are left alone
+    if conn.execute(f"SELECT 1 FROM pragma_index_list('{table_name}') WHERE \"unique\" = 1").fetchone() is None:
+        conn.execute(f"DELETE FROM {table_name} WHERE rowid NOT IN (SELECT MAX(rowid) FROM {table_name} GROUP BY ticker)")
+        conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table_name}_ticker ON {table_name} (ticker)")
+
+def ensure_portfolio_table(conn):
+    """Create the portfolio table keyed by ticker, adding the key to tables written without one"""
+    conn.execute("CREATE TABLE IF NOT EXISTS portfolio (ticker TEXT PRIMARY KEY, shares REAL, purchase_price REAL)")
+    ensure_unique_ticker(conn, 'portfolio')
+
 class DataIntegrator:
     def __init__(self, input_dir='data/processed', output_dir='data/processed'):
         self.input_dir = input_dir
         self.output_dir = output_dir
         os.makedirs(output_dir, exist_ok=True)
         
-        # Create SQLite database
+        # SQLite database
         self.db_path = f"{output_dir}/esg_data.db"
-        self.engine = create_engine(f"sqlite:///{self.db_path}")
         
-    def integrate_company_data(self, ticker_symbol):
-        """Integrate all data for a company into the database"""
+        # Prepared INSERT statements, built once per instance
+        self._insert_sql = {
+            table_name: "INSERT INTO {} ({}) VALUES ({})".format(
+                table_name,
+                ", ".join(f'"{name}"' for name, _ in columns),
+                ", ".join("?" * len(columns))
+            )
+            for table_name, columns in TABLE_SCHEMAS.items()
+        }
+        self._schema_ready = False
+        
+        # Explicit read_csv dtypes so chunks skip type inference
+        self._csv_dtypes = {
+            table_name: {
+                name: str if sql_type == 'TEXT' else 'float64'
+                for name, sql_type in TABLE_SCHEMAS[table_name] if name != 'ticker'
+            }
+            for table_name in FILE_SOURCES
+        }
+        
+    def connect(self):
+        """Open a SQLite connection tuned for bulk writes"""
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+        
+    def ensure_schema(self, conn):
+        """Create the data tables and their ticker indexes if they don't exist"""
+        if self._schema_ready:
+            return
+        for table_name, columns in TABLE_SCHEMAS.items():
+            column_defs = ", ".join(f'"{name}" {sql_type}' for name, sql_type in columns)
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {table_name} ({column_defs})")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table_name}_ticker ON {table_name} (ticker)")
+        conn.commit()
+        self._schema_ready = True
+        
+    def insert_rows(self, conn, table_name, df):
+        """Insert a DataFrame's rows into a table with a single executemany"""
+        # Missing columns become NaN, which SQLite stores as NULL
+        rows = df.reindex(columns=[name for name, _ in TABLE_SCHEMAS[table_name]])
+        conn.executemany(self._insert_sql[table_name], rows.itertuples(index=False, name=None))
+        
+    def read_chunks(self, table_name, path):
+        """Yield DataFrame chunks from a Parquet or CSV source file"""
+        if path.endswith('.parquet'):
+            df = pd.read_parquet(path).reset_index()
+            # Bind timestamps as text, matching the CSV representation
+            for column in df.select_dtypes(include=['datetime', 'datetimetz']).columns:
+                df[column] = df[column].astype(str)
+            yield df
+        else:
+            yield from pd.read_csv(path, chunksize=CSV_CHUNKSIZE, dtype=self._csv_dtypes[table_name])
+        
+    def integrate_company_data(self, tickers):
+        """Integrate all data for one or more companies into the database"""
+        if isinstance(tickers, str):
+            tickers = [tickers]
+            
         try:
-            # Get company info
-            company_info_file = f"data/raw/{ticker_symbol}_company_info.json"
-            if os.path.exists(company_info_file):
-                with open(company_info_file, 'r') as f:
-                    company_info = json.load(f)
-                
-                # Extract basic company info
-                company_data = {
-                    'ticker': ticker_symbol,
-                    'name': company_info.get('shortName', ''),
-                    'sector': company_info.get('sector', ''),
-                    'industry': company_info.get('industry', ''),
-                    'country': company_info.get('country', ''),
-                    'website': company_info.get('website', ''),
-                    'employees': company_info.get('fullTimeEmployees', 0),
-                    'market_cap': company_info.get('marketCap', 0)
-                }
-                
-                # Create companies table
-                companies_df = pd.DataFrame([company_data])
-                companies_df.to_sql('companies', self.engine, if_exists='append', index=False)
-                
-            # Get stock data
-            stock_file = f"data/raw/{ticker_symbol}_stock_data.csv"
-            if os.path.exists(stock_file):
-                stock_df = pd.read_csv(stock_file)
-                stock_df['ticker'] = ticker_symbol
-                stock_df.to_sql('stock_prices', self.engine, if_exists='append', index=False)
-                
-            # Get news data
-            news_file = f"data/raw/{ticker_symbol}_news_data.csv"
-            if os.path.exists(news_file):
-                news_df = pd.read_csv(news_file)
-                news_df['ticker'] = ticker_symbol
-                news_df.to_sql('news', self.engine, if_exists='append', index=False)
-                
-            # Get news content sample
-            news_content_file = f"data/raw/{ticker_symbol}_news_content_sample.csv"
-            if os.path.exists(news_content_file):
-                news_content_df = pd.read_csv(news_content_file)
-                news_content_df['ticker'] = ticker_symbol
-                news_content_df.to_sql('news_content', self.engine, if_exists='append', index=False)
-                
-            # Report text (if available)
-            report_text_file = f"{self.output_dir}/{ticker_symbol}_all_reports.txt"
-            if os.path.exists(report_text_file):
-                with open(report_text_file, 'r', encoding='utf-8') as f:
-                    report_text = f.read()
-                
-                # Store report text
-                report_data = {
-                    'ticker': ticker_symbol,
-                    'report_text': report_text
-                }
-                
-                reports_df = pd.DataFrame([report_data])
-                reports_df.to_sql('reports', self.engine, if_exists='append', index=False)
+            # Collect small rows and data file paths for every ticker, then write each table once
+            companies = []
+            data_files = {table_name: [] for table_name in FILE_SOURCES}
+            reports = []
+            
+            for ticker_symbol in tickers:
+                # Get company info
+                company_info_file = f"data/raw/{ticker_symbol}_company_info.json"
+                if os.path.exists(company_info_file):
+                    with open(company_info_file, 'r') as f:
+                        company_info = json.load(f)
+                    
+                    # Extract basic company info
+                    companies.append({
+                        'ticker': ticker_symbol,
+                        'name': company_info.get('shortName', ''),
+                        'sector': company_info.get('sector', ''),
+                        'industry': company_info.get('industry', ''),
+                        'country': company_info.get('country', ''),
+                        'website': company_info.get('website', ''),
+                        'employees': company_info.get('fullTimeEmployees', 0),
+                        'market_cap': company_info.get('marketCap', 0)
+                    })
+                    
+                # Get stock data, news data and news content sample
+                for table_name, suffix in FILE_SOURCES.items():
+                    for extension in ('parquet', 'csv'):
+                        data_file = f"data/raw/{ticker_symbol}_{suffix}.{extension}"
+                        if os.path.exists(data_file):
+                            data_files[table_name].append((ticker_symbol, data_file))
+                            break
+                    
+                # Report text (if available)
+                report_text_file = f"{self.output_dir}/{ticker_symbol}_all_reports.txt"
+                if os.path.exists(report_text_file):
+                    with open(report_text_file, 'r', encoding='utf-8') as f:
+                        report_text = f.read()
+                    
+                    reports.append({
+                        'ticker': ticker_symbol,
+                        'report_text': report_text
+                    })
+                    
+            # One transaction for all tables; data files are streamed in chunks to cap memory
+            conn = self.connect()
+            try:
+                self.ensure_schema(conn)
+                with conn:
+                    if companies:
+                        self.insert_rows(conn, 'companies', pd.DataFrame(companies))
+                    for table_name, files in data_files.items():
+                        for ticker_symbol, data_file in files:
+                            for chunk in self.read_chunks(table_name, data_file):
+                                chunk['ticker'] = ticker_symbol
+                                self.insert_rows(conn, table_name, chunk)
+                    if reports:
+                        self.insert_rows(conn, 'reports', pd.DataFrame(reports))
+            finally:
+                conn.close()
                 
             return True
         except Exception as e:
-            print(f"Error integrating data for {ticker_symbol}: {e}")
+            print(f"Error integrating data for {', '.join(tickers)}: {e}")
             return False
             
     def create_portfolio_table(self, portfolio_data):
         """Create a portfolio table from user input"""
         try:
             portfolio_df = pd.DataFrame(portfolio_data)
-            portfolio_df.to_sql('portfolio', self.engine, if_exists='replace', index=False)
+            conn = self.connect()
+            try:
+                # Replace the positions but keep the keyed schema, so later upserts still replace rows
+                with conn:
+                    ensure_portfolio_table(conn)
+                    conn.execute("DELETE FROM portfolio")
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO portfolio (ticker, shares, purchase_price) VALUES (?, ?, ?)",
+                        portfolio_df[['ticker', 'shares', 'purchase_price']].itertuples(index=False, name=None)
+                    )
+            finally:
+                conn.close()
             return True
         except Exception as e:
             print(f"Error creating portfolio table: {e}")
@@ -105,8 +216,8 @@ if __name__ == "__main__":
     # Create portfolio table
     integrator.create_portfolio_table(portfolio)
     
-    # Integrate data for each company
-    for ticker in ["MSFT", "AAPL", "GOOG", "TSLA"]:
-        print(f"Integrating data for {ticker}...")
-        result = integrator.integrate_company_data(ticker)
-        print(f"Data integration for {ticker} {'successful' if result else 'failed'}")
\ No newline at end of file
+    # Integrate data for all companies in one batch
+    tickers = ["MSFT", "AAPL", "GOOG", "TSLA"]
+    print(f"Integrating data for {', '.join(tickers)}...")
+    result = integrator.integrate_company_data(tickers)
+    print(f"Data integration {'successful' if result else 'failed'}")
\ No newline at end of file
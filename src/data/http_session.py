@@ -0,0 +1,18 @@
+import requests
+from requests_cache import CachedSession
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+def make_session(cache_dir=None, expire_after=3600):
+    """Create the pooled, retrying HTTP session shared by the data collectors"""
+    # Keep-alive connections are reused across requests; with a cache_dir, responses
+    # are also cached on disk so repeated runs skip the round-trip
+    if cache_dir is not None:
+        session = CachedSession(cache_dir, expire_after=expire_after)
+    else:
+        session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32,
+                          max_retries=Retry(total=3, backoff_factor=0.3))
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
\ No newline at end of file
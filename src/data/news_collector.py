@@ -1,35 +1,49 @@
-import requests
+import asyncio
+import aiohttp
+try:
+    from src.data.http_session import make_session
+except ModuleNotFoundError:  # run directly as a script from src/data
+    from http_session import make_session
 import json
 import pandas as pd
 import os
-import datetime
-from bs4 import BeautifulSoup
-import time
+from datetime import datetime, timedelta, timezone
+from selectolax.parser import HTMLParser
 
 class NewsDataCollector:
     def __init__(self, output_dir='data/raw'):
         self.output_dir = output_dir
         os.makedirs(output_dir, exist_ok=True)
         
+        # Shared, disk-cached HTTP session for GDELT queries. Article pages are
+        # fetched concurrently with aiohttp and bypass this cache
+        self.session = make_session(os.path.join(output_dir, 'http_cache'))
+        self.session.headers['User-Agent'] = (
+            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+            '(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        )
+        
     def fetch_gdelt_news(self, company_name, days_back=30):
         """Fetch news from GDELT Project"""
         try:
-            end_date = datetime.datetime.now()
-            start_date = end_date - datetime.datetime.timedelta(days=days_back)
-            
-            # Format dates for GDELT
-            start_str = start_date.strftime('%Y%m%d%H%M%S')
-            end_str = end_date.strftime('%Y%m%d%H%M%S')
+            # GDELT expects UTC timestamps; truncating to the hour keeps the
+            # request URL stable so the HTTP cache can serve repeated runs
+            end_date = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+            start_date = end_date - timedelta(days=days_back)
             
             # GDELT V2 API endpoint (JSON version)
             base_url = "https://api.gdeltproject.org/api/v2/doc/doc"
-            query = f"sourcelang:english {company_name}"
-            mode = "artlist"
-            format_param = "json"
-            
-            url = f"{base_url}?query={query}&mode={mode}&format={format_param}&startdatetime={start_str}&enddatetime={end_str}&maxrecords=250"
+            params = {
+                'query': f"sourcelang:english {company_name}",
+                'mode': "artlist",
+                'format': "json",
+                'startdatetime': start_date.strftime('%Y%m%d%H%M%S'),
+                'enddatetime': end_date.strftime('%Y%m%d%H%M%S'),
+                'maxrecords': 250
+            }
             
-            response = requests.get(url, timeout=30)
+            # Let requests handle the query-string encoding
+            response = self.session.get(base_url, params=params, timeout=30)
             if response.status_code == 200:
                 data = response.json()
                 articles = data.get('articles', [])
@@ -44,26 +58,35 @@ class NewsDataCollector:
             print(f"Error fetching GDELT news for {company_name}: {e}")
             return pd.DataFrame()
      
-    def fetch_news_content(self, url):
-        """Fetch and extract content from a news article URL"""
-        try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            response = requests.get(url, headers=headers, timeout=10)
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # Extract article content - this is a simplified approach
-                # Real implementation would need more sophisticated extraction
-                paragraphs = soup.find_all('p')
-                text = ' '.join([p.get_text() for p in paragraphs])
+    def extract_article_text(self, html):
+        """Extract article text from an HTML page"""
+        tree = HTMLParser(html)
+        
+        # Extract article content - this is a simplified approach
+        # Real implementation would need more sophisticated extraction
+        return ' '.join(p.text() for p in tree.css('p'))
+        
+    async def _fetch_one(self, session, url, semaphore):
+        """Fetch and extract content from one article within the concurrency limit"""
+        async with semaphore:
+            try:
+                async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as response:
+                    if response.status == 200:
+                        html = await response.read()
+                        return self.extract_article_text(html)
+                    return ""
+            except Exception as e:
+                print(f"Error fetching content from {url}: {e}")
+                return ""
                 
-                return text
-            return ""
-        except Exception as e:
-            print(f"Error fetching content from {url}: {e}")
-            return ""
+    async def _fetch_all(self, urls, concurrency=8):
+        """Fetch content for all article URLs concurrently, in input order"""
+        semaphore = asyncio.Semaphore(concurrency)
+        # Cap connections per host so a single site is not hammered
+        connector = aiohttp.TCPConnector(limit_per_host=4)
+        async with aiohttp.ClientSession(connector=connector,
+                                         headers={'User-Agent': self.session.headers['User-Agent']}) as session:
+            return await asyncio.gather(*[self._fetch_one(session, url, semaphore) for url in urls])
         
     def save_news_data(self, company_name, ticker_symbol, days_back=30):
         """Save news data for a company"""
@@ -79,11 +102,7 @@ class NewsDataCollector:
             news_df = news_df.sample(sample_size)
             
             # Add content column
-            contents = []
-            for url in news_df['url']:
-                content = self.fetch_news_content(url)
-                contents.append(content)
-                time.sleep(2)  # Be respectful with scraping
+            contents = asyncio.run(self._fetch_all(list(news_df['url'])))
                 
             news_df['content'] = contents
             news_df.to_csv(f"{self.output_dir}/{ticker_symbol}_news_content_sample.csv", index=False)
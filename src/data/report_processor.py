@@ -1,8 +1,22 @@
 import os
-import requests
-import pdfplumber
+import shutil
+import multiprocessing
+try:
+    from src.data.http_session import make_session
+except ModuleNotFoundError:  # run directly as a script from src/data
+    from http_session import make_session
+import fitz  # PyMuPDF
 import pandas as pd
-import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+def extract_text_from_pdf(pdf_path):
+    """Extract text content from a PDF file"""
+    try:
+        with fitz.open(pdf_path) as doc:
+            return "".join(page.get_text() for page in doc)
+    except Exception as e:
+        print(f"Error extracting text from {pdf_path}: {e}")
+        return ""
 
 class ReportProcessor:
     def __init__(self, input_dir='data/raw', output_dir='data/processed'):
@@ -10,33 +24,35 @@ class ReportProcessor:
         self.output_dir = output_dir
         os.makedirs(output_dir, exist_ok=True)
         
+        # Shared HTTP session; PDFs are streamed to disk, so responses aren't cached
+        self.session = make_session()
+        
+        # One extraction pool per processor, reused across companies. Workers are started
+        # on demand, so a call never runs more of them than it has PDFs, and they are
+        # spawned rather than forked because callers may be threaded or have torch loaded
+        self.extract_pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1,
+                                                mp_context=multiprocessing.get_context("spawn"))
+        
     def download_report(self, url, output_path):
         """Download a PDF report from a URL"""
         try:
-            response = requests.get(url, stream=True, timeout=30)
-            if response.status_code == 200:
-                with open(output_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
-                return True
-            else:
-                print(f"Failed to download {url}. Status code: {response.status_code}")
-                return False
+            with self.session.get(url, stream=True, timeout=30) as response:
+                if response.status_code == 200:
+                    # Let urllib3 undo gzip/deflate so the file holds the raw PDF bytes
+                    response.raw.decode_content = True
+                    with open(output_path, 'wb') as f:
+                        shutil.copyfileobj(response.raw, f, length=1024 * 1024)
+                    return True
+                else:
+                    print(f"Failed to download {url}. Status code: {response.status_code}")
+                    return False
         except Exception as e:
             print(f"Error downloading {url}: {e}")
             return False
             
     def extract_text_from_pdf(self, pdf_path):
         """Extract text content from a PDF file"""
-        try:
-            text = ""
-            with pdfplumber.open(pdf_path) as pdf:
-                for page in pdf.pages:
-                    text += page.extract_text() or ""
-            return text
-        except Exception as e:
-            print(f"Error extracting text from {pdf_path}: {e}")
-            return ""
+        return extract_text_from_pdf(pdf_path)
             
     def process_company_reports(self, ticker_symbol):
         """Process all reports for a given company"""
@@ -54,31 +70,33 @@ class ReportProcessor:
         with open(report_urls_file, 'r') as f:
             urls = [line.strip() for line in f if line.strip()]
             
-        # Download and process each report
-        all_text = ""
-        for i, url in enumerate(urls):
-            pdf_filename = f"{reports_dir}/report_{i+1}.pdf"
-            
-            # Download the report
-            print(f"Downloading report from {url}...")
-            if self.download_report(url, pdf_filename):
-                # Extract text
-                print(f"Extracting text from {pdf_filename}...")
-                text = self.extract_text_from_pdf(pdf_filename)
-                
-                if text:
-                    # Save text to file
-                    with open(f"{reports_dir}/report_{i+1}.txt", 'w', encoding='utf-8') as f:
-                        f.write(text)
-                    
-                    all_text += text + "\n\n"
+        # Download all reports concurrently - this stage is network-bound
+        pdf_paths = [f"{reports_dir}/report_{i+1}.pdf" for i in range(len(urls))]
+        print(f"Downloading {len(urls)} reports for {ticker_symbol}...")
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            downloaded = list(executor.map(self.download_report, urls, pdf_paths))
+        pdf_paths = [path for path, ok in zip(pdf_paths, downloaded) if ok]
+        
+        # Extract text in parallel processes - this stage is CPU-bound
+        texts = []
+        if pdf_paths:
+            print(f"Extracting text from {len(pdf_paths)} reports for {ticker_symbol}...")
+            texts = list(self.extract_pool.map(extract_text_from_pdf, pdf_paths))
+        
+        text_parts = []
+        for pdf_path, text in zip(pdf_paths, texts):
+            if text:
+                # Save text to file, encoding once and skipping text-mode translation
+                with open(f"{os.path.splitext(pdf_path)[0]}.txt", 'wb') as f:
+                    f.write(text.encode('utf-8'))
                 
-            time.sleep(2)  # Be respectful with downloading
+                text_parts.append(text)
         
         # Save combined text
-        if all_text:
-            with open(f"{self.output_dir}/{ticker_symbol}_all_reports.txt", 'w', encoding='utf-8') as f:
-                f.write(all_text)
+        if text_parts:
+            all_text = "\n\n".join(text_parts) + "\n\n"
+            with open(f"{self.output_dir}/{ticker_symbol}_all_reports.txt", 'wb') as f:
+                f.write(all_text.encode('utf-8'))
             return True
             
         return False
@@ -2,6 +2,15 @@ import pandas as pd
 import sqlite3
 import numpy as np
 
+# Simulated ESG profile per sector: env mean/std, social mean/std, governance mean/std
+SECTOR_PROFILE = {
+    "Technology": (75, 10, 80, 8, 75, 12),
+    "Healthcare": (75, 10, 80, 8, 75, 12),
+    "Energy": (50, 15, 60, 10, 65, 10),
+    "Basic Materials": (50, 15, 60, 10, 65, 10)
+}
+DEFAULT_SECTOR_PROFILE = (65, 12, 70, 10, 70, 8)
+
 class ESGBenchmarkGenerator:
     def __init__(self, db_path='data/processed/esg_data.db'):
         self.db_path = db_path
@@ -19,39 +28,21 @@ class ESGBenchmarkGenerator:
             "Consumer Defensive", "Utilities", "Real Estate"
         ]
         
-        benchmarks = []
-        for sector in sectors:
-            # Simulated scores - different sectors have different typical ESG profiles
-            if sector in ["Technology", "Healthcare"]:
-                env_score = np.random.normal(75, 10)
-                social_score = np.random.normal(80, 8)
-                gov_score = np.random.normal(75, 12)
-            elif sector in ["Energy", "Basic Materials"]:
-                env_score = np.random.normal(50, 15)
-                social_score = np.random.normal(60, 10)
-                gov_score = np.random.normal(65, 10)
-            else:
-                env_score = np.random.normal(65, 12)
-                social_score = np.random.normal(70, 10)
-                gov_score = np.random.normal(70, 8)
-            
-            # Ensure scores are within 0-100 range
-            env_score = max(0, min(100, env_score))
-            social_score = max(0, min(100, social_score))
-            gov_score = max(0, min(100, gov_score))
-            
-            overall_score = (env_score * 0.4 + social_score * 0.3 + gov_score * 0.3)
-            
-            benchmarks.append({
-                'sector': sector,
-                'environmental_benchmark': env_score,
-                'social_benchmark': social_score,
-                'governance_benchmark': gov_score,
-                'overall_benchmark': overall_score
-            })
+        # Simulated scores - different sectors have different typical ESG profiles
+        profiles = np.array([SECTOR_PROFILE.get(sector, DEFAULT_SECTOR_PROFILE) for sector in sectors])
+        
+        # Draw all sector scores at once and ensure they are within 0-100 range
+        scores = np.clip(np.random.normal(profiles[:, 0::2], profiles[:, 1::2]), 0, 100)
+        overall_scores = scores @ np.array([0.4, 0.3, 0.3])
         
         # Create DataFrame and save to database
-        benchmarks_df = pd.DataFrame(benchmarks)
+        benchmarks_df = pd.DataFrame({
+            'sector': sectors,
+            'environmental_benchmark': scores[:, 0],
+            'social_benchmark': scores[:, 1],
+            'governance_benchmark': scores[:, 2],
+            'overall_benchmark': overall_scores
+        })
         conn = sqlite3.connect(self.db_path)
         benchmarks_df.to_sql('sector_benchmarks', conn, if_exists='replace', index=False)
         conn.close()
@@ -72,7 +63,7 @@ class ESGBenchmarkGenerator:
             # Load sector benchmarks
             try:
                 benchmarks = pd.read_sql("SELECT * FROM sector_benchmarks", conn)
-            except:
+            except (sqlite3.Error, pd.io.sql.DatabaseError):
                 conn.close()
                 benchmarks = self.load_sector_benchmarks()
                 conn = sqlite3.connect(self.db_path)
@@ -80,54 +71,33 @@ class ESGBenchmarkGenerator:
             # Merge data
             merged = esg_scores.merge(companies, on='ticker')
             
+            # Attach each company's sector benchmark; sectors without one use the average of all sectors
+            merged = merged.merge(benchmarks, on='sector', how='left')
+            benchmark_columns = ['environmental_benchmark', 'social_benchmark', 'governance_benchmark', 'overall_benchmark']
+            merged[benchmark_columns] = merged[benchmark_columns].fillna(benchmarks[benchmark_columns].mean())
+            
             # Create comparisons
-            comparisons = []
-            for _, company in merged.iterrows():
-                sector = company['sector']
-                sector_benchmark = benchmarks[benchmarks['sector'] == sector]
-                
-                if sector_benchmark:
-                # Create comparisons
-                    comparisons = []
-            for _, company in merged.iterrows():
-                sector = company['sector']
-                sector_benchmark = benchmarks[benchmarks['sector'] == sector]
-                
-                if sector_benchmark.empty:
-                    # If sector not found, use average of all sectors
-                    sector_benchmark = benchmarks.mean()
-                    benchmark_env = sector_benchmark['environmental_benchmark']
-                    benchmark_social = sector_benchmark['social_benchmark']
-                    benchmark_gov = sector_benchmark['governance_benchmark']
-                    benchmark_overall = sector_benchmark['overall_benchmark']
-                else:
-                    benchmark_env = sector_benchmark['environmental_benchmark'].iloc[0]
-                    benchmark_social = sector_benchmark['social_benchmark'].iloc[0]
-                    benchmark_gov = sector_benchmark['governance_benchmark'].iloc[0]
-                    benchmark_overall = sector_benchmark['overall_benchmark'].iloc[0]
-                
-                comparison = {
-                    'ticker': company['ticker'],
-                    'sector': sector,
-                    'company_env_score': company['environmental_score'],
-                    'sector_env_benchmark': benchmark_env,
-                    'env_difference': company['environmental_score'] - benchmark_env,
-                    'company_social_score': company['social_score'],
-                    'sector_social_benchmark': benchmark_social,
-                    'social_difference': company['social_score'] - benchmark_social,
-                    'company_gov_score': company['governance_score'],
-                    'sector_gov_benchmark': benchmark_gov,
-                    'gov_difference': company['governance_score'] - benchmark_gov,
-                    'company_overall_score': company['overall_esg_score'],
-                    'sector_overall_benchmark': benchmark_overall,
-                    'overall_difference': company['overall_esg_score'] - benchmark_overall
-                }
-                
-                comparisons.append(comparison)
+            comparisons_df = pd.DataFrame({
+                'ticker': merged['ticker'],
+                'sector': merged['sector'],
+                'company_env_score': merged['environmental_score'],
+                'sector_env_benchmark': merged['environmental_benchmark'],
+                'env_difference': merged['environmental_score'] - merged['environmental_benchmark'],
+                'company_social_score': merged['social_score'],
+                'sector_social_benchmark': merged['social_benchmark'],
+                'social_difference': merged['social_score'] - merged['social_benchmark'],
+                'company_gov_score': merged['governance_score'],
+                'sector_gov_benchmark': merged['governance_benchmark'],
+                'gov_difference': merged['governance_score'] - merged['governance_benchmark'],
+                'company_overall_score': merged['overall_esg_score'],
+                'sector_overall_benchmark': merged['overall_benchmark'],
+                'overall_difference': merged['overall_esg_score'] - merged['overall_benchmark']
+            })
             
-            # Create DataFrame and save to database
-            comparisons_df = pd.DataFrame(comparisons)
+            # Save to database
             comparisons_df.to_sql('company_benchmark_comparisons', conn, if_exists='replace', index=False)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_company_benchmark_comparisons_ticker ON company_benchmark_comparisons (ticker)")
+            conn.commit()
             
             conn.close()
             return comparisons_df
@@ -1,13 +1,16 @@
+import zlib
 import pandas as pd
 import numpy as np
 import sqlite3
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-import matplotlib.pyplot as plt
-import seaborn as sns
 import streamlit as st
 
+# Above this many companies the heatmap drops its per-cell labels: the heatmap itself is
+# drawn as one raster image, but each label is a separate SVG text node
+HEATMAP_LABEL_MAX_ROWS = 50
+
 class ESGVisualizer:
     def __init__(self, db_path='data/processed/esg_data.db'):
         self.db_path = db_path
@@ -16,30 +19,32 @@ class ESGVisualizer:
         """Load all necessary data for visualization"""
         conn = sqlite3.connect(self.db_path)
         
-        self.portfolio = pd.read_sql("SELECT * FROM portfolio", conn)
+        # Portfolio joined with company info and ESG scores in SQLite; USING(ticker)
+        # keeps a single ticker column and the joins use the ticker indexes
+        self.portfolio = pd.read_sql("""
+            SELECT *
+            FROM portfolio
+            JOIN companies USING (ticker)
+            JOIN esg_scores USING (ticker)
+        """, conn)
         self.esg_scores = pd.read_sql("SELECT * FROM esg_scores", conn)
-        self.companies = pd.read_sql("SELECT * FROM companies", conn)
         self.comparisons = pd.read_sql("SELECT * FROM company_benchmark_comparisons", conn)
         
-        # Merge data for portfolio analysis
-        self.portfolio = self.portfolio.merge(self.companies, on='ticker')
-        self.portfolio = self.portfolio.merge(self.esg_scores, on='ticker')
-        
         conn.close()
         
+        # Simulated current price, seeded by the tickers so it is stable across reruns
+        rng = np.random.default_rng(zlib.crc32(",".join(self.portfolio['ticker']).encode('utf-8')))
+        self.portfolio['current_price'] = rng.uniform(0.8, 1.2, len(self.portfolio)) * self.portfolio['purchase_price']
+        
     def create_portfolio_summary(self):
         """Create portfolio ESG summary visualization"""
         # Calculate portfolio value and weights
-        self.portfolio['current_price'] = np.random.uniform(0.8, 1.2, len(self.portfolio)) * self.portfolio['purchase_price']  # Simulated current price
-        self.portfolio['value'] = self.portfolio['shares'] * self.portfolio['current_price']
-        total_value = self.portfolio['value'].sum()
-        self.portfolio['weight'] = self.portfolio['value'] / total_value
+        value = (self.portfolio['shares'] * self.portfolio['current_price']).to_numpy()
+        weights = value / value.sum()
         
-        # Calculate weighted ESG scores
-        self.portfolio['weighted_env'] = self.portfolio['environmental_score'] * self.portfolio['weight']
-        self.portfolio['weighted_social'] = self.portfolio['social_score'] * self.portfolio['weight']
-        self.portfolio['weighted_gov'] = self.portfolio['governance_score'] * self.portfolio['weight']
-        self.portfolio['weighted_overall'] = self.portfolio['overall_esg_score'] * self.portfolio['weight']
+        # Calculate weighted ESG scores as one weights @ scores product
+        score_matrix = self.portfolio[['environmental_score', 'social_score', 'governance_score', 'overall_esg_score']].to_numpy()
+        weighted_totals = weights @ score_matrix
         
         # Create summary plot
         fig = make_subplots(
@@ -52,7 +57,7 @@ class ESGVisualizer:
         fig.add_trace(
             go.Pie(
                 labels=self.portfolio['ticker'],
-                values=self.portfolio['value'],
+                values=value,
                 textinfo='label+percent',
                 hole=0.4,
             ),
@@ -62,12 +67,7 @@ class ESGVisualizer:
         # Weighted ESG scores
         weighted_scores = pd.DataFrame({
             'Category': ['Environmental', 'Social', 'Governance', 'Overall'],
-            'Score': [
-                self.portfolio['weighted_env'].sum(),
-                self.portfolio['weighted_social'].sum(),
-                self.portfolio['weighted_gov'].sum(),
-                self.portfolio['weighted_overall'].sum()
-            ]
+            'Score': weighted_totals
         })
         
         fig.add_trace(
@@ -89,21 +89,26 @@ class ESGVisualizer:
         
     def create_company_comparison(self):
         """Create company ESG score comparison visualization"""
-        # Prepare data
-        company_data = []
-        for _, row in self.comparisons.iterrows():
-            company_data.extend([
-                {'Ticker': row['ticker'], 'Category': 'Environmental', 'Score': row['company_env_score'], 'Type': 'Company'},
-                {'Ticker': row['ticker'], 'Category': 'Environmental', 'Score': row['sector_env_benchmark'], 'Type': 'Sector Benchmark'},
-                {'Ticker': row['ticker'], 'Category': 'Social', 'Score': row['company_social_score'], 'Type': 'Company'},
-                {'Ticker': row['ticker'], 'Category': 'Social', 'Score': row['sector_social_benchmark'], 'Type': 'Sector Benchmark'},
-                {'Ticker': row['ticker'], 'Category': 'Governance', 'Score': row['company_gov_score'], 'Type': 'Company'},
-                {'Ticker': row['ticker'], 'Category': 'Governance', 'Score': row['sector_gov_benchmark'], 'Type': 'Sector Benchmark'},
-                {'Ticker': row['ticker'], 'Category': 'Overall', 'Score': row['company_overall_score'], 'Type': 'Company'},
-                {'Ticker': row['ticker'], 'Category': 'Overall', 'Score': row['sector_overall_benchmark'], 'Type': 'Sector Benchmark'}
-            ])
-        
-        comparison_df = pd.DataFrame(company_data)
+        # Prepare data: reshape the wide comparison table into one row per (ticker, category, type)
+        score_columns = {
+            'company_env_score': ('Environmental', 'Company'),
+            'sector_env_benchmark': ('Environmental', 'Sector Benchmark'),
+            'company_social_score': ('Social', 'Company'),
+            'sector_social_benchmark': ('Social', 'Sector Benchmark'),
+            'company_gov_score': ('Governance', 'Company'),
+            'sector_gov_benchmark': ('Governance', 'Sector Benchmark'),
+            'company_overall_score': ('Overall', 'Company'),
+            'sector_overall_benchmark': ('Overall', 'Sector Benchmark')
+        }
+        column_labels = pd.DataFrame(list(score_columns.values()), index=list(score_columns), columns=['Category', 'Type'])
+        
+        comparison_df = self.comparisons.melt(
+            id_vars='ticker',
+            value_vars=list(score_columns),
+            var_name='column',
+            value_name='Score'
+        )
+        comparison_df = comparison_df.join(column_labels, on='column').rename(columns={'ticker': 'Ticker'})
         
         # Create grouped bar chart
         fig = px.bar(
@@ -132,80 +137,101 @@ class ESGVisualizer:
         """Create ESG score heatmap visualization"""
         # Prepare data
         heatmap_data = self.esg_scores[['ticker', 'environmental_score', 'social_score', 'governance_score', 'overall_esg_score']]
-        heatmap_data = heatmap_data.set_index('ticker')
-        
-        # Rename columns for better display
-        heatmap_data.columns = ['Environmental', 'Social', 'Governance', 'Overall']
-        
-        # Create heatmap
-        fig, ax = plt.subplots(figsize=(10, 6))
-        sns.heatmap(
-            heatmap_data, 
-            annot=True, 
-            cmap='Blues', 
-            linewidths=.5,
-            ax=ax, 
-            fmt='.1f',
-            vmin=0,
-            vmax=100
+        
+        # Rename columns for better display (on a new frame, leaving self.esg_scores untouched)
+        heatmap_data = heatmap_data.set_index('ticker').rename(columns={
+            'environmental_score': 'Environmental',
+            'social_score': 'Social',
+            'governance_score': 'Governance',
+            'overall_esg_score': 'Overall'
+        })
+        
+        # Create heatmap from the raw array; Plotly draws the cell labels itself
+        fig = px.imshow(
+            heatmap_data.values,
+            x=heatmap_data.columns,
+            y=heatmap_data.index,
+            color_continuous_scale='Blues',
+            text_auto='.1f' if len(heatmap_data) <= HEATMAP_LABEL_MAX_ROWS else False,
+            zmin=0,
+            zmax=100,
+            aspect='auto',
+            title='ESG Score Heatmap by Company'
         )
         
-        plt.title('ESG Score Heatmap by Company')
-        plt.tight_layout()
+        return fig
+        
+    def create_radar_chart(self, ticker):
+        """Create the ESG profile radar chart for one company"""
+        company = self.comparisons.loc[self.comparisons['ticker'] == ticker].iloc[0]
+        categories = ['Environmental', 'Social', 'Governance']
+        company_scores = [
+            company['company_env_score'],
+            company['company_social_score'],
+            company['company_gov_score']
+        ]
+        
+        benchmark_scores = [
+            company['sector_env_benchmark'],
+            company['sector_social_benchmark'],
+            company['sector_gov_benchmark']
+        ]
+        
+        # Create radar chart
+        fig = go.Figure()
+        
+        fig.add_trace(go.Scatterpolar(
+            r=company_scores,
+            theta=categories,
+            fill='toself',
+            name=f"{company['ticker']} Scores",
+            line_color='#2196F3'
+        ))
+        
+        fig.add_trace(go.Scatterpolar(
+            r=benchmark_scores,
+            theta=categories,
+            fill='toself',
+            name=f"{company['sector']} Sector Benchmark",
+            line_color='#9E9E9E'
+        ))
+        
+        fig.update_layout(
+            polar=dict(
+                radialaxis=dict(
+                    visible=True,
+                    range=[0, 100]
+                )),
+            showlegend=True,
+            title=f"ESG Profile: {company['ticker']} vs {company['sector']} Sector"
+        )
         
         return fig
         
     def create_radar_charts(self):
         """Create radar charts for ESG profile visualization"""
         # Create radar charts for each company
-        radar_figs = []
-        
-        for _, company in self.comparisons.iterrows():
-            categories = ['Environmental', 'Social', 'Governance']
-            company_scores = [
-                company['company_env_score'],
-                company['company_social_score'],
-                company['company_gov_score']
-            ]
-            
-            benchmark_scores = [
-                company['sector_env_benchmark'],
-                company['sector_social_benchmark'],
-                company['sector_gov_benchmark']
-            ]
-            
-            # Create radar chart
-            fig = go.Figure()
-            
-            fig.add_trace(go.Scatterpolar(
-                r=company_scores,
-                theta=categories,
-                fill='toself',
-                name=f"{company['ticker']} Scores",
-                line_color='#2196F3'
-            ))
-            
-            fig.add_trace(go.Scatterpolar(
-                r=benchmark_scores,
-                theta=categories,
-                fill='toself',
-                name=f"{company['sector']} Sector Benchmark",
-                line_color='#9E9E9E'
-            ))
-            
-            fig.update_layout(
-                polar=dict(
-                    radialaxis=dict(
-                        visible=True,
-                        range=[0, 100]
-                    )),
-                showlegend=True,
-                title=f"ESG Profile: {company['ticker']} vs {company['sector']} Sector"
-            )
-            
-            radar_figs.append(fig)
-        
-        return radar_figs
+        return [self.create_radar_chart(ticker) for ticker in self.comparisons['ticker']]
+
+@st.cache_resource(max_entries=1)
+def load_visualizer(db_path, db_version):
+    """Load the visualization data once per database version"""
+    # The instance is shared by every session, so the create_* builders only read
+    # its DataFrames and keep derived data in locals
+    visualizer = ESGVisualizer(db_path)
+    visualizer.load_data()
+    return visualizer
+
+@st.cache_data(ttl=300, max_entries=8)
+def load_figure_json(db_path, db_version, figure_name):
+    """Build one dashboard figure as Plotly JSON, once per database version"""
+    visualizer = load_visualizer(db_path, db_version)
+    return getattr(visualizer, f"create_{figure_name}")().to_json()
+
+@st.cache_data(ttl=300, max_entries=64)
+def load_radar_chart_json(db_path, db_version, ticker):
+    """Build one company's radar chart as Plotly JSON, once per database version"""
+    return load_visualizer(db_path, db_version).create_radar_chart(ticker).to_json()
 
 # Example usage
 if __name__ == "__main__":
@@ -221,7 +247,6 @@ if __name__ == "__main__":
     # Display the figures (when not in Streamlit)
     portfolio_summary.show()
     company_comparison.show()
-    plt.figure(esg_heatmap.number)
-    plt.show()
+    esg_heatmap.show()
     for fig in radar_charts:
         fig.show()
\ No newline at end of file
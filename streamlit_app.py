@@ -1,28 +1,16 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-import matplotlib.pyplot as plt
 import os
+import re
 import sqlite3
 import sys
-import time
-import json
+import hashlib
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Add source directory to path
 sys.path.append(str(Path(__file__).parent))
 
-# Import project modules
-from src.data.company_collector import CompanyDataCollector
-from src.data.news_collector import NewsDataCollector
-from src.data.report_processor import ReportProcessor
-from src.data.data_integrator import DataIntegrator
-from src.models.esg_scorer import ESGScorer
-from src.models.benchmark_generator import ESGBenchmarkGenerator
-from src.visualization.esg_visualizer import ESGVisualizer
-
 # Set page config
 st.set_page_config(
     page_title="GreenInvest: ESG Portfolio Analysis",
@@ -36,6 +24,151 @@ os.makedirs("data/raw", exist_ok=True)
 os.makedirs("data/processed", exist_ok=True)
 DB_PATH = "data/processed/esg_data.db"
 
+# Radar charts shown per dashboard page
+RADAR_PAGE_SIZE = 4
+
+# Yahoo Finance symbols: a letter or digit followed by up to 14 letters, digits, dots,
+# dashes, carets or equals signs (e.g. 7203.T, RELIANCE.NS, BRK-B, ^GSPC, EURUSD=X)
+TICKER_RE = re.compile(r'[A-Z0-9^][A-Z0-9.\-^=]{0,14}')
+
+def database_version(db_path):
+    """Modification times of the database and its WAL file, used as a cache key"""
+    # In WAL mode new writes land in the -wal file until a checkpoint, so watch both
+    return tuple(
+        os.path.getmtime(path) if os.path.exists(path) else 0
+        for path in (db_path, f"{db_path}-wal")
+    )
+
+# Collectors and models are created once per process and shared across reruns.
+# Project modules (and the torch/transformers stack behind them) are imported where
+# they are used, so pages that don't need them never load them
+@st.cache_resource
+def get_company_collector():
+    """Shared company data collector"""
+    from src.data.company_collector import CompanyDataCollector
+    return CompanyDataCollector()
+
+@st.cache_resource
+def get_news_collector():
+    """Shared news data collector"""
+    from src.data.news_collector import NewsDataCollector
+    return NewsDataCollector()
+
+@st.cache_resource
+def get_report_processor():
+    """Shared report processor"""
+    from src.data.report_processor import ReportProcessor
+    return ReportProcessor()
+
+@st.cache_resource
+def get_scorer(db_path):
+    """Shared ESG scorer, so the NLP models load once"""
+    from src.models.esg_scorer import ESGScorer
+    return ESGScorer(db_path)
+
+@st.cache_resource
+def get_benchmark_generator(db_path):
+    """Shared sector benchmark generator"""
+    from src.models.benchmark_generator import ESGBenchmarkGenerator
+    return ESGBenchmarkGenerator(db_path)
+
+def get_conn():
+    """Session-scoped autocommit connection in WAL mode, kept open across reruns"""
+    # One connection per browser session: reruns reuse its warm page cache, while
+    # concurrent sessions never share a connection between threads
+    if 'db_conn' not in st.session_state:
+        from src.data.data_integrator import ensure_portfolio_table
+        conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        ensure_portfolio_table(conn)
+        conn.execute("CREATE TABLE IF NOT EXISTS analysis_state (key TEXT PRIMARY KEY, value TEXT)")
+        st.session_state['db_conn'] = conn
+    return st.session_state['db_conn']
+
+# Tables whose rows feed ESG scoring and sector benchmarking
+SCORING_INPUT_TABLES = ['companies', 'reports', 'news_content']
+
+def analysis_token(tickers):
+    """Fingerprint of what ESG scoring depends on: the ticker set and a version of its text data"""
+    # Position sizes don't affect scores, so only the sorted tickers are hashed
+    tickers = sorted(set(tickers))
+    digest = hashlib.blake2b(",".join(tickers).encode('utf-8'), digest_size=16)
+    
+    # Integration only appends rows, so a row count and max rowid per table version its data
+    placeholders = ", ".join("?" * len(tickers))
+    for table_name in SCORING_INPUT_TABLES:
+        try:
+            row = get_conn().execute(
+                f"SELECT COUNT(*), MAX(rowid) FROM {table_name} WHERE ticker IN ({placeholders})", tickers
+            ).fetchone()
+        except sqlite3.OperationalError:  # table not created yet
+            row = None
+        digest.update(f"{table_name}:{row}".encode('utf-8'))
+    return digest.hexdigest()
+
+# Tables the analysis writes; a stored token only counts while they exist
+ANALYSIS_OUTPUT_TABLES = ['esg_scores', 'company_benchmark_comparisons']
+
+def load_scored_token():
+    """Token of the inputs the stored ESG scores were computed from, if those outputs still exist"""
+    conn = get_conn()
+    placeholders = ", ".join("?" * len(ANALYSIS_OUTPUT_TABLES))
+    (output_count,) = conn.execute(
+        f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN ({placeholders})", ANALYSIS_OUTPUT_TABLES
+    ).fetchone()
+    if output_count < len(ANALYSIS_OUTPUT_TABLES):
+        return None
+    row = conn.execute("SELECT value FROM analysis_state WHERE key = 'scored_token'").fetchone()
+    return row[0] if row else None
+
+def save_scored_token(token):
+    """Remember which inputs the stored ESG scores were computed from"""
+    get_conn().execute("INSERT OR REPLACE INTO analysis_state (key, value) VALUES ('scored_token', ?)", (token,))
+
+def set_radar_page(page):
+    """Button callback that moves the radar chart pager"""
+    st.session_state['radar_page'] = page
+
+# Cached database reads: Streamlit reruns the script on every interaction, so each
+# loader takes the database version and only re-queries after the data has changed
+CATEGORY_COLUMNS = ['sector', 'industry']
+# Money columns stay float64 so position values keep cent precision
+FLOAT64_COLUMNS = ['shares', 'purchase_price']
+
+def compact_dtypes(df):
+    """Downcast scores to float32 and repeated labels to categories"""
+    dtypes = {column: 'float32' for column in df.select_dtypes('float64').columns if column not in FLOAT64_COLUMNS}
+    dtypes.update({column: 'category' for column in CATEGORY_COLUMNS if column in df.columns})
+    return df.astype(dtypes)
+
+def read_query(query):
+    """Run a read query against the ESG database"""
+    return compact_dtypes(pd.read_sql(query, get_conn()))
+
+@st.cache_data(ttl=300)
+def load_companies(db_version):
+    """Load the companies in the database"""
+    return read_query("SELECT ticker, name, sector, industry FROM companies")
+
+@st.cache_data(ttl=300)
+def load_portfolio(db_version):
+    """Load the saved portfolio"""
+    return read_query("SELECT * FROM portfolio")
+
+@st.cache_data(ttl=300)
+def load_report_data(db_version):
+    """Load portfolio positions with company info, ESG scores and benchmark differences in one join"""
+    return read_query("""
+        SELECT p.*, c.name, c.sector,
+               s.environmental_score, s.social_score, s.governance_score, s.overall_esg_score,
+               b.env_difference, b.social_difference, b.gov_difference, b.overall_difference
+        FROM portfolio p
+        JOIN companies c USING (ticker)
+        JOIN esg_scores s USING (ticker)
+        JOIN company_benchmark_comparisons b USING (ticker)
+    """)
+
 # App title and introduction
 st.title("🌿 GreenInvest: ESG Portfolio Analysis")
 st.markdown("""
@@ -97,44 +230,53 @@ elif app_mode == "Add Companies to Database":
         full_collection = st.checkbox("Collect complete data (news, reports)", value=False)
         submitted = st.form_submit_button("Add Companies")
         
+        tickers = []
         if submitted and tickers_input:
-            tickers = [ticker.strip().upper() for ticker in tickers_input.split(",")]
-            
+            # Validate before any network I/O; duplicates are dropped, order is kept
+            entries = [entry.strip() for entry in tickers_input.upper().split(",") if entry.strip()]
+            tickers = list(dict.fromkeys(entry for entry in entries if TICKER_RE.fullmatch(entry)))
+            invalid = [entry for entry in entries if not TICKER_RE.fullmatch(entry)]
+            if invalid:
+                st.warning(f"Skipping invalid ticker symbols: {', '.join(invalid)}")
+        
+        if tickers:
             progress_bar = st.progress(0)
             status_text = st.empty()
             
-            # Process each ticker
-            for i, ticker in enumerate(tickers):
-                progress = (i) / len(tickers)
-                progress_bar.progress(progress)
-                status_text.text(f"Processing {ticker}...")
-                
+            collector = get_company_collector()
+            news_collector = get_news_collector()
+            report_processor = get_report_processor()
+            
+            def process_ticker(ticker, stock_data):
+                """Collect all raw data for one ticker (runs in a worker thread)"""
                 # Collect basic company data
-                collector = CompanyDataCollector()
-                result = collector.save_company_data(ticker)
-                
-                if result and full_collection:
-                    # Get company info for better news search
-                    try:
-                        company_info_path = f"data/raw/{ticker}_company_info.json"
-                        with open(company_info_path, 'r') as f:
-                            company_info = json.load(f)
-                        company_name = company_info.get('shortName', ticker)
-                    except:
-                        company_name = ticker
+                company_info = collector.save_company_data(ticker, stock_data)
                 
+                if company_info is not None and full_collection:
+                    # Use the company name for better news search
+                    company_name = company_info.get('shortName', ticker)
+                    
                     # Collect news
-                    news_collector = NewsDataCollector()
                     news_collector.save_news_data(company_name, ticker)
                     
                     # Process reports
-                    report_processor = ReportProcessor()
                     report_processor.process_company_reports(ticker)
             
-            # Integrate all data
+            # Price histories come from one batched download; the rest is network-bound,
+            # so tickers are collected concurrently and progress is reported as each finishes
+            status_text.text(f"Processing {', '.join(tickers)}...")
+            stock_data = collector.get_stock_data_batch(tickers)
+            with ThreadPoolExecutor(max_workers=8) as ticker_executor:
+                futures = {ticker_executor.submit(process_ticker, ticker, stock_data.get(ticker)): ticker for ticker in tickers}
+                for done, future in enumerate(as_completed(futures), start=1):
+                    future.result()
+                    progress_bar.progress(done / len(tickers))
+                    status_text.text(f"Processed {futures[future]} ({done}/{len(tickers)})")
+            
+            # Integrate all data in a single transaction
+            from src.data.data_integrator import DataIntegrator
             integrator = DataIntegrator()
-            for ticker in tickers:
-                integrator.integrate_company_data(ticker)
+            integrator.integrate_company_data(tickers)
             
             # Update progress
             progress_bar.progress(1.0)
@@ -144,21 +286,21 @@ elif app_mode == "Add Companies to Database":
             st.success(f"Added {len(tickers)} companies to the database. You can now create a portfolio.")
             
             # Show the companies in the database
-            conn = sqlite3.connect(DB_PATH)
-            companies_df = pd.read_sql("SELECT ticker, name, sector, industry FROM companies", conn)
-            conn.close()
+            st.cache_data.clear()
+            companies_df = load_companies(database_version(DB_PATH))
             
             st.subheader("Companies in Database")
             st.dataframe(companies_df)
 
 # Create/Edit Portfolio
 elif app_mode == "Create/Edit Portfolio":
+    import plotly.graph_objects as go
+    
     st.header("Create or Edit Your Portfolio")
     
     # Load available companies
-    conn = sqlite3.connect(DB_PATH)
     try:
-        companies_df = pd.read_sql("SELECT ticker, name, sector, industry FROM companies", conn)
+        companies_df = load_companies(database_version(DB_PATH))
         
         # Check if there are companies in the database
         if companies_df.empty:
@@ -167,11 +309,9 @@ elif app_mode == "Create/Edit Portfolio":
             
         # Load existing portfolio if available
         try:
-            portfolio_df = pd.read_sql("SELECT * FROM portfolio", conn)
-        except:
+            portfolio_df = load_portfolio(database_version(DB_PATH))
+        except (sqlite3.Error, pd.io.sql.DatabaseError):
             portfolio_df = pd.DataFrame(columns=['ticker', 'shares', 'purchase_price'])
-            
-        conn.close()
         
         # Display available companies
         with st.expander("Available Companies"):
@@ -196,14 +336,15 @@ elif app_mode == "Create/Edit Portfolio":
                     portfolio_df.loc[portfolio_df['ticker'] == ticker, 'shares'] = shares
                     portfolio_df.loc[portfolio_df['ticker'] == ticker, 'purchase_price'] = price
                 else:
-                    # Add new position
-                    new_position = pd.DataFrame({'ticker': [ticker], 'shares': [shares], 'purchase_price': [price]})
-                    portfolio_df = pd.concat([portfolio_df, new_position], ignore_index=True)
+                    # Add new position in place
+                    portfolio_df.loc[len(portfolio_df)] = pd.Series({'ticker': ticker, 'shares': shares, 'purchase_price': price})
                 
-                # Save to database
-                conn = sqlite3.connect(DB_PATH)
-                portfolio_df.to_sql('portfolio', conn, if_exists='replace', index=False)
-                conn.close()
+                # Save only the changed row to the database
+                get_conn().execute(
+                    "INSERT OR REPLACE INTO portfolio (ticker, shares, purchase_price) VALUES (?, ?, ?)",
+                    (ticker, shares, price)
+                )
+                st.cache_data.clear()
                 
                 st.success(f"Added/updated {ticker} position in your portfolio.")
         
@@ -215,46 +356,38 @@ elif app_mode == "Create/Edit Portfolio":
             display_portfolio = portfolio_df.merge(companies_df[['ticker', 'name']], on='ticker')
             
             # Calculate total value
-            display_portfolio['total_value'] = display_portfolio['shares'] * display_portfolio['purchase_price']
+            display_portfolio['total_value'] = display_portfolio['shares'].to_numpy() * display_portfolio['purchase_price'].to_numpy()
             
-            # Format for display
+            # Labels and number formats are applied by the frontend instead of a Styler pass
             display_portfolio = display_portfolio[['ticker', 'name', 'shares', 'purchase_price', 'total_value']]
-            display_portfolio = display_portfolio.rename(columns={
-                'ticker': 'Ticker',
-                'name': 'Company',
-                'shares': 'Shares',
-                'purchase_price': 'Purchase Price ($)',
-                'total_value': 'Total Value ($)'
+            st.dataframe(display_portfolio, column_config={
+                'ticker': st.column_config.TextColumn('Ticker'),
+                'name': st.column_config.TextColumn('Company'),
+                'shares': st.column_config.NumberColumn('Shares', format='%.2f'),
+                'purchase_price': st.column_config.NumberColumn('Purchase Price ($)', format='$%.2f'),
+                'total_value': st.column_config.NumberColumn('Total Value ($)', format='$%.2f')
             })
             
-            st.dataframe(display_portfolio.style.format({
-                'Shares': '{:.2f}',
-                'Purchase Price ($)': '${:.2f}',
-                'Total Value ($)': '${:.2f}'
-            }))
-            
             # Portfolio summary
-            total_investment = display_portfolio['Total Value ($)'].sum()
+            total_investment = display_portfolio['total_value'].sum()
             st.metric("Total Portfolio Value", f"${total_investment:.2f}")
             
             # Generate portfolio pie chart
-            fig = px.pie(
-                display_portfolio, 
-                names='Ticker', 
-                values='Total Value ($)',
-                title="Portfolio Allocation",
-                hover_data=['Company'],
-                color_discrete_sequence=px.colors.qualitative.Plotly
-            )
+            # Plain arrays skip plotly.express' per-column DataFrame introspection
+            fig = go.Figure(go.Pie(
+                labels=display_portfolio['ticker'].to_numpy(),
+                values=display_portfolio['total_value'].to_numpy(),
+                customdata=display_portfolio['name'].to_numpy(),
+                hovertemplate='%{label} (%{customdata})<br>$%{value:.2f}<extra></extra>'
+            ))
+            fig.update_layout(title="Portfolio Allocation")
             st.plotly_chart(fig)
             
             # Option to clear portfolio
             if st.button("Reset Portfolio"):
-                conn = sqlite3.connect(DB_PATH)
-                cursor = conn.cursor()
-                cursor.execute("DROP TABLE IF EXISTS portfolio")
-                conn.commit()
-                conn.close()
+                # Empty the table in place; the schema and ticker index stay
+                get_conn().execute("DELETE FROM portfolio")
+                st.cache_data.clear()
                 st.success("Portfolio has been reset. Refresh the page to see changes.")
                 
         else:
@@ -262,97 +395,115 @@ elif app_mode == "Create/Edit Portfolio":
             
     except Exception as e:
         st.error(f"Error: {e}")
-        conn.close()
         st.info("If you haven't added companies yet, please go to 'Add Companies to Database' first.")
 
 # ESG Analysis Dashboard
 elif app_mode == "ESG Analysis Dashboard":
+    import plotly.io as pio
+    from src.visualization.esg_visualizer import load_visualizer, load_figure_json, load_radar_chart_json
+    
     st.header("ESG Portfolio Analysis Dashboard")
     
-    # Check if portfolio exists
-    conn = sqlite3.connect(DB_PATH)
+    # Check if portfolio exists; get_conn creates the table, so a missing portfolio reads as empty
     try:
-        portfolio_df = pd.read_sql("SELECT * FROM portfolio", conn)
-        conn.close()
-        
-        if portfolio_df.empty:
-            st.warning("Your portfolio is empty. Please create a portfolio first.")
-            st.stop()
-    except:
-        conn.close()
-        st.warning("Portfolio not found. Please create a portfolio first.")
+        portfolio_df = load_portfolio(database_version(DB_PATH))
+    except (sqlite3.Error, pd.io.sql.DatabaseError):
+        portfolio_df = pd.DataFrame(columns=['ticker', 'shares', 'purchase_price'])
+    
+    if portfolio_df.empty:
+        st.warning("Your portfolio is empty. Please create a portfolio first.")
         st.stop()
     
     # Run analysis button
     if st.button("Run ESG Analysis"):
-        with st.spinner("Analyzing ESG factors for your portfolio..."):
-            # Score companies
-            scorer = ESGScorer(DB_PATH)
-            tickers = portfolio_df['ticker'].tolist()
-            scores = scorer.score_portfolio(tickers)
-            
-            # Generate benchmarks
-            benchmark_generator = ESGBenchmarkGenerator(DB_PATH)
-            benchmark_generator.load_sector_benchmarks()
-            benchmark_generator.generate_company_comparisons()
-            
-            st.success("Analysis complete!")
+        # Skip re-scoring when neither the portfolio's tickers nor their text data have changed;
+        # the token is kept in the database, next to the scores it describes
+        token = analysis_token(portfolio_df['ticker'].tolist())
+        if token == load_scored_token():
+            st.info("ESG scores are already up to date for this portfolio.")
+        else:
+            with st.spinner("Analyzing ESG factors for your portfolio..."):
+                # Score companies
+                scorer = get_scorer(DB_PATH)
+                tickers = portfolio_df['ticker'].tolist()
+                scores = scorer.score_portfolio(tickers)
+                
+                # Generate benchmarks
+                benchmark_generator = get_benchmark_generator(DB_PATH)
+                benchmark_generator.load_sector_benchmarks()
+                comparisons = benchmark_generator.generate_company_comparisons()
+                st.cache_data.clear()
+                
+                # Only a fully successful run marks the portfolio as up to date
+                if not scores.empty and not comparisons.empty:
+                    save_scored_token(token)
+                    st.success("Analysis complete!")
+                else:
+                    st.error("ESG analysis failed. Please try running it again.")
         
     # Create visualizations
     try:
-        visualizer = ESGVisualizer(DB_PATH)
-        visualizer.load_data()
-        
-        # Portfolio summary
-        st.subheader("Portfolio ESG Summary")
-        portfolio_summary = visualizer.create_portfolio_summary()
-        st.plotly_chart(portfolio_summary)
-        
-        # ESG Heatmap
-        st.subheader("ESG Score Heatmap")
-        esg_heatmap = visualizer.create_esg_heatmap()
-        st.pyplot(esg_heatmap)
+        # Only the selected view is built; each figure is cached until the database changes
+        db_version = database_version(DB_PATH)
+        view = st.radio(
+            "View",
+            ["Portfolio Summary", "ESG Heatmap", "Sector Comparison", "ESG Profiles"],
+            horizontal=True
+        )
         
-        # Company comparisons
-        st.subheader("Company ESG Scores vs. Sector Benchmarks")
-        company_comparison = visualizer.create_company_comparison()
-        st.plotly_chart(company_comparison)
-        
-        # Radar charts
-        st.subheader("ESG Profiles by Company")
-        radar_charts = visualizer.create_radar_charts()
-        
-        # Display radar charts in columns
-        cols = st.columns(min(2, len(radar_charts)))
-        for i, radar_chart in enumerate(radar_charts):
-            with cols[i % 2]:
-                st.plotly_chart(radar_chart)
+        if view == "Portfolio Summary":
+            st.subheader("Portfolio ESG Summary")
+            portfolio_summary = pio.from_json(load_figure_json(DB_PATH, db_version, 'portfolio_summary'))
+            st.plotly_chart(portfolio_summary)
+            
+        elif view == "ESG Heatmap":
+            st.subheader("ESG Score Heatmap")
+            esg_heatmap = pio.from_json(load_figure_json(DB_PATH, db_version, 'esg_heatmap'))
+            st.plotly_chart(esg_heatmap)
+            
+        elif view == "Sector Comparison":
+            st.subheader("Company ESG Scores vs. Sector Benchmarks")
+            company_comparison = pio.from_json(load_figure_json(DB_PATH, db_version, 'company_comparison'))
+            st.plotly_chart(company_comparison)
+            
+        else:
+            st.subheader("ESG Profiles by Company")
+            radar_tickers = load_visualizer(DB_PATH, db_version).comparisons['ticker'].tolist()
+            
+            if radar_tickers:
+                # Only the current page of radar charts is built and sent to the browser
+                page_count = -(-len(radar_tickers) // RADAR_PAGE_SIZE)
+                page = min(st.session_state.setdefault('radar_page', 0), page_count - 1)
+                page_tickers = radar_tickers[page * RADAR_PAGE_SIZE:(page + 1) * RADAR_PAGE_SIZE]
+                
+                # Display radar charts in columns
+                cols = st.columns(min(2, len(page_tickers)))
+                for i, ticker in enumerate(page_tickers):
+                    with cols[i % 2]:
+                        st.plotly_chart(pio.from_json(load_radar_chart_json(DB_PATH, db_version, ticker)))
+                
+                if page_count > 1:
+                    nav_cols = st.columns(3)
+                    nav_cols[0].button("Previous", disabled=page == 0, on_click=set_radar_page, args=(page - 1,))
+                    nav_cols[1].markdown(f"Page {page + 1} of {page_count}")
+                    nav_cols[2].button("Next", disabled=page == page_count - 1, on_click=set_radar_page, args=(page + 1,))
+            else:
+                st.info("No ESG profiles yet. Run the ESG analysis first.")
         
         # Add report generation button
         if st.button("Generate ESG Report"):
             st.info("Generating detailed ESG report...")
             
-            # Get data for report
-            conn = sqlite3.connect(DB_PATH)
-            esg_scores = pd.read_sql("SELECT * FROM esg_scores", conn)
-            companies = pd.read_sql("SELECT * FROM companies", conn)
-            comparisons = pd.read_sql("SELECT * FROM company_benchmark_comparisons", conn)
-            portfolio = pd.read_sql("SELECT * FROM portfolio", conn)
-            conn.close()
-            
-            # Create merged data for report
-            report_data = portfolio.merge(companies, on='ticker')
-            report_data = report_data.merge(esg_scores, on='ticker')
-            report_data = report_data.merge(comparisons[['ticker', 'env_difference', 'social_difference', 'gov_difference', 'overall_difference']], on='ticker')
+            # Get data for report, joined in SQLite on the ticker indexes
+            report_data = load_report_data(database_version(DB_PATH))
             
             # Calculate portfolio weightings
-            report_data['value'] = report_data['shares'] * report_data['purchase_price']
-            total_value = report_data['value'].sum()
-            report_data['weight'] = report_data['value'] / total_value
+            weights = report_data['shares'].to_numpy() * report_data['purchase_price'].to_numpy()
+            weights = weights / weights.sum()
             
-            # Calculate weighted scores
-            report_data['weighted_overall'] = report_data['overall_esg_score'] * report_data['weight']
-            portfolio_esg_score = report_data['weighted_overall'].sum()
+            # Calculate weighted scores as one scores.T @ weights product
+            score_matrix = report_data[['environmental_score', 'social_score', 'governance_score', 'overall_esg_score']].to_numpy()
+            env_score, social_score, gov_score, portfolio_esg_score = score_matrix.T @ weights
             
             # Generate report
             st.header("ESG Portfolio Analysis Report")
@@ -362,17 +513,17 @@ elif app_mode == "ESG Analysis Dashboard":
             st.markdown("### ESG Performance Summary")
             summary_cols = st.columns(4)
             with summary_cols[0]:
-                st.metric("Environmental", f"{(report_data['environmental_score'] * report_data['weight']).sum():.1f}")
+                st.metric("Environmental", f"{env_score:.1f}")
             with summary_cols[1]:
-                st.metric("Social", f"{(report_data['social_score'] * report_data['weight']).sum():.1f}")
+                st.metric("Social", f"{social_score:.1f}")
             with summary_cols[2]:
-                st.metric("Governance", f"{(report_data['governance_score'] * report_data['weight']).sum():.1f}")
+                st.metric("Governance", f"{gov_score:.1f}")
             with summary_cols[3]:
                 st.metric("Overall", f"{portfolio_esg_score:.1f}")
             
             # Top performers
             st.markdown("### Top ESG Performers in Your Portfolio")
-            top_performers = report_data.sort_values('overall_esg_score', ascending=False).head(3)
+            top_performers = report_data.nlargest(3, 'overall_esg_score')
             for i, (_, company) in enumerate(top_performers.iterrows()):
                 st.markdown(f"**{i+1}. {company['name']} ({company['ticker']})**")
                 st.markdown(f"Overall ESG Score: {company['overall_esg_score']:.1f}/100")
@@ -382,7 +533,7 @@ elif app_mode == "ESG Analysis Dashboard":
             # Areas for improvement
             st.markdown("### Areas for Improvement")
             # Find companies with biggest negative differences from benchmarks
-            needs_improvement = report_data.sort_values('overall_difference').head(3)
+            needs_improvement = report_data.nsmallest(3, 'overall_difference')
             for i, (_, company) in enumerate(needs_improvement.iterrows()):
                 st.markdown(f"**{i+1}. {company['name']} ({company['ticker']})**")
                 st.markdown(f"Overall ESG Score: {company['overall_esg_score']:.1f}/100")